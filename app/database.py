@@ -3,34 +3,44 @@ Database module for storing graphs and workflow runs.
 Uses SQLite for simplicity and in-memory storage option.
 """
 
-import json
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Mapping
 from datetime import datetime
-from dataclasses import asdict
+from collections import OrderedDict
+import threading
+import copy
+from types import MappingProxyType
 
 # Using simple in-memory storage for this assignment
 class Database:
     """Simple in-memory database for graphs and runs."""
 
-    def __init__(self):
+    def __init__(self, run_capacity: int = 10_000):
         self.graphs: Dict[str, Dict[str, Any]] = {}
-        self.runs: Dict[str, Dict[str, Any]] = {}
+        # Runs live in slot dicts that are allocated on first use and then reused
+        # in place; once run_capacity slots exist the least recently used run is evicted.
+        self.run_capacity = run_capacity
+        self._run_slots: List[Dict[str, Any]] = []
+        self._run_index: "OrderedDict[str, int]" = OrderedDict()  # run_id -> slot, LRU first
+        self._free_slots: List[int] = []  # Slots released by delete_run
+        # Runs execute in worker threads that append steps while the event loop reads
+        self._runs_lock = threading.Lock()
 
     # Graph operations
     def save_graph(self, graph_id: str, graph_data: Dict[str, Any]) -> None:
-        """Save a graph."""
+        """Save a copy of a graph, so later changes to graph_data don't reach the stored graph."""
         self.graphs[graph_id] = {
-            **graph_data,
+            **copy.deepcopy(graph_data),
             "saved_at": datetime.utcnow().isoformat(),
         }
 
-    def get_graph(self, graph_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a graph."""
-        return self.graphs.get(graph_id)
+    def get_graph(self, graph_id: str) -> Optional[Mapping[str, Any]]:
+        """Retrieve a graph as a read-only view."""
+        graph = self.graphs.get(graph_id)
+        return MappingProxyType(graph) if graph is not None else None
 
-    def list_graphs(self) -> List[Dict[str, Any]]:
-        """List all graphs."""
-        return list(self.graphs.values())
+    def list_graphs(self) -> List[Mapping[str, Any]]:
+        """List all graphs as read-only views."""
+        return [MappingProxyType(graph) for graph in self.graphs.values()]
 
     def delete_graph(self, graph_id: str) -> bool:
         """Delete a graph."""
@@ -40,56 +50,112 @@ class Database:
         return False
 
     # Run operations
+    def _acquire_run_slot(self, run_id: str) -> Dict[str, Any]:
+        """
+        Get the slot for a run, claiming a free or least recently used one.
+        A newly claimed slot is emptied but keeps its execution_log list for reuse.
+        Callers must hold _runs_lock.
+        """
+        slot_idx = self._run_index.pop(run_id, None)
+        if slot_idx is None:
+            if self._free_slots:
+                slot_idx = self._free_slots.pop()
+            elif len(self._run_slots) < self.run_capacity:
+                slot_idx = len(self._run_slots)
+                self._run_slots.append({})
+            else:
+                _, slot_idx = self._run_index.popitem(last=False)
+            slot = self._run_slots[slot_idx]
+            execution_log = slot.get("execution_log")
+            slot.clear()
+            if isinstance(execution_log, list):
+                execution_log.clear()
+                slot["execution_log"] = execution_log
+        self._run_index[run_id] = slot_idx
+        return self._run_slots[slot_idx]
+
     def save_run(self, run_id: str, run_data: Dict[str, Any]) -> None:
-        """Save a workflow run."""
-        # Convert datetime objects to ISO format strings
-        run_copy = dict(run_data)
-        if "created_at" in run_copy and isinstance(run_copy["created_at"], datetime):
-            run_copy["created_at"] = run_copy["created_at"].isoformat()
-        if "completed_at" in run_copy and isinstance(run_copy["completed_at"], datetime):
-            run_copy["completed_at"] = run_copy["completed_at"].isoformat()
-        
-        # Handle execution_log with datetime objects
-        if "execution_log" in run_copy:
-            execution_log = []
-            for step in run_copy["execution_log"]:
-                step_copy = dict(step)
-                if isinstance(step_copy.get("timestamp"), datetime):
-                    step_copy["timestamp"] = step_copy["timestamp"].isoformat()
-                execution_log.append(step_copy)
-            run_copy["execution_log"] = execution_log
-        
-        self.runs[run_id] = run_copy
+        """
+        Save a workflow run.
+        Values are stored as given; datetimes are left for the response
+        encoder to serialize, so runs that are never read are never formatted.
+        If run_data has no execution_log, steps already stored via append_step are kept.
+        """
+        with self._runs_lock:
+            slot = self._acquire_run_slot(run_id)
+            execution_log = slot.get("execution_log")
+            if slot is not run_data:
+                slot.clear()
+                slot.update(run_data)
+
+            # Refill the slot's existing log list rather than allocating a new one
+            if execution_log is None:
+                execution_log = []
+            if "execution_log" in run_data:
+                execution_log[:] = run_data["execution_log"]
+            slot["execution_log"] = execution_log
+
+    def append_step(self, run_id: str, step: Dict[str, Any]) -> None:
+        """Append a single execution step to a run, creating the run entry if needed."""
+        with self._runs_lock:
+            slot = self._acquire_run_slot(run_id)
+            slot.setdefault("execution_log", []).append(step)
+
+    def _copy_run(self, slot_idx: int) -> Dict[str, Any]:
+        """
+        Copy a run out of its slot, so callers keep a consistent view after the
+        slot is evicted and refilled. Callers must hold _runs_lock.
+        """
+        run = dict(self._run_slots[slot_idx])
+        if "execution_log" in run:
+            run["execution_log"] = list(run["execution_log"])
+        return run
 
     def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a workflow run."""
-        return self.runs.get(run_id)
+        """Retrieve a copy of a workflow run."""
+        with self._runs_lock:
+            slot_idx = self._run_index.get(run_id)
+            if slot_idx is None:
+                return None
+            self._run_index.move_to_end(run_id)
+            return self._copy_run(slot_idx)
 
     def list_runs(self, graph_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """List all runs, optionally filtered by graph_id."""
-        if graph_id:
-            return [run for run in self.runs.values() if run.get("graph_id") == graph_id]
-        return list(self.runs.values())
+        """List copies of all runs, optionally filtered by graph_id."""
+        with self._runs_lock:
+            return [
+                self._copy_run(slot_idx)
+                for slot_idx in self._run_index.values()
+                if not graph_id or self._run_slots[slot_idx].get("graph_id") == graph_id
+            ]
 
     def update_run(self, run_id: str, updates: Dict[str, Any]) -> bool:
         """Update a run."""
-        if run_id not in self.runs:
-            return False
-        self.runs[run_id].update(updates)
-        return True
+        with self._runs_lock:
+            slot_idx = self._run_index.get(run_id)
+            if slot_idx is None:
+                return False
+            self._run_slots[slot_idx].update(updates)
+            return True
 
     def delete_run(self, run_id: str) -> bool:
         """Delete a run."""
-        if run_id in self.runs:
-            del self.runs[run_id]
+        with self._runs_lock:
+            slot_idx = self._run_index.pop(run_id, None)
+            if slot_idx is None:
+                return False
+            self._run_slots[slot_idx].clear()
+            self._free_slots.append(slot_idx)
             return True
-        return False
 
 
-# Global database instance
-_db = Database()
+# Global database instance, created on first use
+_db: Optional[Database] = None
 
 
 def get_db() -> Database:
     """Get the global database instance."""
+    global _db
+    if _db is None:
+        _db = Database()
     return _db
@@ -3,33 +3,165 @@ Core workflow engine module.
 Defines the graph structure, nodes, execution logic, and state management.
 """
 
-from typing import Callable, Dict, Any, Optional, List, Tuple
+from typing import Callable, Dict, Any, Optional, List, Tuple, Iterator, Mapping
+from types import MappingProxyType
 from dataclasses import dataclass, field
-from enum import Enum
+from collections import OrderedDict, deque
+from itertools import islice
+from functools import partial
+from enum import IntEnum
+import sys
 import uuid
-from datetime import datetime
+import base64
+import time
+import textwrap
+import threading
+import copy
+from datetime import datetime, timedelta
 import json
 
 
-class NodeType(str, Enum):
+# Maximum number of cached results kept per pure node
+MEMO_CACHE_SIZE = 128
+
+# Maximum number of steps kept in a run's in-memory execution log
+MAX_LOG_STEPS = 10_000
+
+# Called with (run, step) right after each step is logged
+StepCallback = Callable[["WorkflowRun", "ExecutionStep"], None]
+
+# Graphs larger than this use the interpreted loop; the generated if/elif
+# dispatch chain is linear in the number of nodes
+CODEGEN_MAX_NODES = 32
+
+# Source template for WorkflowGraph.compile(); {start} and {arms} are filled in
+_RUNNER_TEMPLATE = """
+def _run(initial_state, max_steps=100, on_step=None):
+    run = WorkflowRun(
+        run_id=new_run_id(),
+        graph_id=graph_id,
+        state=dict(initial_state),
+        initial_state=dict(initial_state),
+    )
+    state = run.state
+    t0_ns = run._t0_ns
+    idx = {start}
+    step_count = 0
+    state_version = 0
+    while idx >= 0 and step_count < max_steps:
+        step_count += 1
+        try:
+{arms}
+        except Exception as e:
+            record_failure(run, idx, e, state_version, on_step)
+            break
+    run.is_completed = True
+    run.final_state = state
+    run.completed_at = datetime.utcnow()
+    return run
+"""
+
+# Runner for graphs whose path from the start node never branches: the nodes
+# are called in order with no dispatch; {length} is the number of steps
+_STRAIGHT_RUNNER_TEMPLATE = """
+def _run(initial_state, max_steps=100, on_step=None):
+    if max_steps < {length}:
+        return interpret(initial_state, max_steps, on_step)
+    run = WorkflowRun(
+        run_id=new_run_id(),
+        graph_id=graph_id,
+        state=dict(initial_state),
+        initial_state=dict(initial_state),
+    )
+    state = run.state
+    t0_ns = run._t0_ns
+    state_version = 0
+    idx = -1
+    try:
+{steps}
+    except Exception as e:
+        record_failure(run, idx, e, state_version, on_step)
+    run.is_completed = True
+    run.final_state = state
+    run.completed_at = datetime.utcnow()
+    return run
+"""
+
+# One node's step: call it, apply and record its result
+_NODE_STEP_TEMPLATE = """\
+result = func_{idx}(state)
+output_delta = dict(result) if result else {{}}
+input_delta = {{k: state[k] for k in output_delta if k in state}}
+if output_delta:
+    state.update(output_delta)
+    state_version += 1
+step = ExecutionStep(
+    {node_id!r}, perf_counter_ns() - t0_ns, input_delta, output_delta,
+    "completed", state_version,
+)
+run.log_step(step)
+if on_step is not None:
+    on_step(run, step)"""
+
+# Step for nodes marked side_effect; their return value is never inspected
+_SIDE_EFFECT_STEP_TEMPLATE = """\
+func_{idx}(state)
+step = ExecutionStep(
+    {node_id!r}, perf_counter_ns() - t0_ns, {{}}, {{}},
+    "completed", state_version,
+)
+run.log_step(step)
+if on_step is not None:
+    on_step(run, step)"""
+
+
+def new_run_id() -> str:
+    """Generate a run ID: a random UUID encoded as 22 URL-safe base64 characters."""
+    return base64.urlsafe_b64encode(uuid.uuid4().bytes)[:22].decode("ascii")
+
+
+def _canonical(value: Any) -> Any:
+    """Convert a state value into a hashable form for memoization keys."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class NodeType(IntEnum):
     """Types of nodes in the workflow."""
-    STANDARD = "standard"
-    CONDITIONAL = "conditional"
-    LOOP = "loop"
+    STANDARD = 0
+    CONDITIONAL = 1
+    LOOP = 2
+
+    @classmethod
+    def from_name(cls, name: str) -> "NodeType":
+        """Look up a node type by its name, e.g. "standard"."""
+        try:
+            return cls[name.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown node type '{name}'") from None
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionStep:
-    """Represents a single step in workflow execution."""
+    """
+    Represents a single step in workflow execution.
+    Only the keys a node wrote are recorded; full states are rebuilt on demand.
+    """
     node_id: str
-    timestamp: datetime
-    input_state: Dict[str, Any]
-    output_state: Dict[str, Any]
+    timestamp_ns: int  # Nanoseconds since the run started (monotonic clock)
+    input_delta: Dict[str, Any]  # Prior values of the keys the node overwrote
+    output_delta: Dict[str, Any]  # Keys written by the node
     status: str  # "completed", "failed", "skipped"
+    state_version: int = 0  # Number of state updates applied after this step
     error_message: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     """Represents a node in the workflow graph."""
     id: str
@@ -39,17 +171,62 @@ class Node:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowRun:
     """Represents an execution of a workflow."""
     run_id: str
     graph_id: str
     state: Dict[str, Any]
-    execution_log: List[ExecutionStep] = field(default_factory=list)
+    # State before the first step still held in execution_log
+    initial_state: Dict[str, Any] = field(default_factory=dict)
+    execution_log: "deque[ExecutionStep]" = field(default_factory=lambda: deque(maxlen=MAX_LOG_STEPS))
     is_completed: bool = False
     final_state: Optional[Dict[str, Any]] = None
     created_at: datetime = field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
+    # Monotonic clock reading taken alongside created_at; anchors step timestamps
+    _t0_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    def timestamp_of(self, step: ExecutionStep) -> datetime:
+        """Convert a step's monotonic offset into a wall-clock datetime."""
+        return self.created_at + timedelta(microseconds=step.timestamp_ns / 1000)
+
+    def log_step(self, step: ExecutionStep) -> None:
+        """
+        Append a step to the execution log window.
+        When the window is full the oldest step is folded into initial_state,
+        so the remaining steps can still be replayed.
+        """
+        log = self.execution_log
+        if len(log) == log.maxlen:
+            self.initial_state.update(log[0].output_delta)
+        log.append(step)
+
+    def state_at(self, step_index: int) -> Dict[str, Any]:
+        """
+        Reconstruct the state as it was after the given step.
+        Pass -1 to get the initial state.
+        """
+        state = dict(self.initial_state)
+        for step in islice(self.execution_log, step_index + 1):
+            state.update(step.output_delta)
+        return state
+
+    def iter_states(self) -> Iterator[Tuple[ExecutionStep, Mapping[str, Any], Mapping[str, Any]]]:
+        """
+        Yield (step, input_state, output_state) for every logged step.
+        Replays the deltas once, so the whole log is rebuilt in a single pass.
+        States are read-only views; a step's input is the previous step's
+        output object, so each snapshot is built only once.
+        Changes a node makes to the state in place, instead of returning them,
+        are visible in the live state but not in the replayed history.
+        """
+        state = MappingProxyType(dict(self.initial_state))
+        for step in self.execution_log:
+            input_state = state
+            if step.output_delta:
+                state = MappingProxyType({**state, **step.output_delta})
+            yield step, input_state, state
 
 
 class WorkflowGraph:
@@ -65,8 +242,36 @@ class WorkflowGraph:
         self.edges: Dict[str, str] = {}  # From node_id -> to node_id
         self.branching_rules: Dict[str, Callable[[Dict[str, Any]], str]] = {}  # node_id -> condition function
         self.loop_conditions: Dict[str, Callable[[Dict[str, Any]], bool]] = {}  # node_id -> loop condition
+        self.branches: Dict[str, Dict[str, str]] = {}  # node_id -> {branch result -> target node_id}
+        self.loop_targets: Dict[str, str] = {}  # node_id -> loop back node_id
+        self.fan_out: Dict[str, List[str]] = {}  # node_id -> successors that may run in parallel
         self.start_node: Optional[str] = None
         self.created_at = datetime.utcnow()
+        # node_id -> LRU of (projected inputs -> result) for nodes marked "pure"
+        self._memo: Dict[str, "OrderedDict[Tuple, Dict[str, Any]]"] = {}
+        self._memo_lock = threading.Lock()  # A graph may run in several threads at once
+
+        # Serialized form returned by to_dict(), rebuilt after any mutation
+        self._dict_cache: Optional[Dict[str, Any]] = None
+
+        # Array (SoA) layout built lazily by _compile(); -1 means "no next node"
+        self._compiled = False
+        self._index: Dict[str, int] = {}
+        self._node_ids: List[str] = []
+        self._names: List[str] = []
+        self._funcs: List[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = []
+        self._side_effect: List[bool] = []
+        self._linear_next: List[int] = []
+        self._branch_fn: List[Optional[Callable[[Dict[str, Any]], str]]] = []
+        self._branch_table: List[Dict[str, int]] = []
+        self._loop_fn: List[Optional[Callable[[Dict[str, Any]], bool]]] = []
+        self._loop_target: List[int] = []
+        # DAG layout, available when the graph has no branching or loops
+        self._successors: List[List[int]] = []
+        self._dag_order: Optional[List[int]] = None  # Topological order from the start node
+        self._dag_indegree: Dict[int, int] = {}  # Predecessor count of each reachable node
+        # Specialized execution function produced by compile()
+        self._runner: Optional[Callable[..., WorkflowRun]] = None
 
     def add_node(
         self,
@@ -76,7 +281,18 @@ class WorkflowGraph:
         node_type: NodeType = NodeType.STANDARD,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
-        """Add a node to the graph."""
+        """
+        Add a node to the graph.
+        Set metadata={"pure": True, "inputs": [...]} to cache the node's result
+        by the values of the listed state keys, or metadata={"side_effect": True}
+        for nodes run only for their effects, whose return value is ignored.
+        """
+        node_id = sys.intern(node_id)
+        # Branching and loop rules may be set before their node is added
+        if node_id in self.loop_conditions:
+            node_type = NodeType.LOOP
+        elif node_id in self.branching_rules:
+            node_type = NodeType.CONDITIONAL
         node = Node(
             id=node_id,
             name=name,
@@ -85,14 +301,32 @@ class WorkflowGraph:
             metadata=metadata or {},
         )
         self.nodes[node_id] = node
+        self._memo.pop(node_id, None)
+        self._compiled = False
+        self._dict_cache = None
 
     def add_edge(self, from_node_id: str, to_node_id: str) -> None:
-        """Add an edge from one node to another."""
-        if from_node_id not in self.nodes:
-            raise ValueError(f"Source node '{from_node_id}' does not exist")
-        if to_node_id not in self.nodes:
-            raise ValueError(f"Target node '{to_node_id}' does not exist")
+        """
+        Add an edge from one node to another.
+        Nodes may be added later; references are checked by validate().
+        """
+        from_node_id, to_node_id = sys.intern(from_node_id), sys.intern(to_node_id)
         self.edges[from_node_id] = to_node_id
+        self._compiled = False
+        self._dict_cache = None
+
+    def add_fan_out(self, from_node_id: str, to_node_ids: List[str]) -> None:
+        """
+        Add edges from one node to several successors.
+        A successor runs once all of its predecessors have completed; with
+        execute_async() independent successors run concurrently. Fan-out
+        graphs must be acyclic and cannot use branching or loops.
+        """
+        from_node_id = sys.intern(from_node_id)
+        to_node_ids = [sys.intern(to_node_id) for to_node_id in to_node_ids]
+        self.fan_out.setdefault(from_node_id, []).extend(to_node_ids)
+        self._compiled = False
+        self._dict_cache = None
 
     def set_branching(
         self,
@@ -105,18 +339,14 @@ class WorkflowGraph:
         condition_func should return a key from branches dict.
         branches maps condition results to next node IDs.
         """
-        if node_id not in self.nodes:
-            raise ValueError(f"Node '{node_id}' does not exist")
-        
-        self.nodes[node_id].node_type = NodeType.CONDITIONAL
+        node_id = sys.intern(node_id)
+        branches = {sys.intern(key): sys.intern(target) for key, target in branches.items()}
         self.branching_rules[node_id] = condition_func
-        
-        # Add edges for each branch
-        for branch_key, next_node_id in branches.items():
-            if next_node_id not in self.nodes:
-                raise ValueError(f"Target node '{next_node_id}' does not exist")
-            # Store as "{node_id}_{branch_key}" -> next_node_id for tracking
-            self.edges[f"{node_id}_{branch_key}"] = next_node_id
+        self.branches[node_id] = branches
+        if node_id in self.nodes and node_id not in self.loop_conditions:
+            self.nodes[node_id].node_type = NodeType.CONDITIONAL
+        self._compiled = False
+        self._dict_cache = None
 
     def set_loop(
         self,
@@ -128,124 +358,565 @@ class WorkflowGraph:
         Set loop logic for a node.
         If condition_func returns True, execution loops back to loop_back_node_id.
         """
-        if node_id not in self.nodes:
-            raise ValueError(f"Node '{node_id}' does not exist")
-        if loop_back_node_id not in self.nodes:
-            raise ValueError(f"Loop back node '{loop_back_node_id}' does not exist")
-        
-        self.nodes[node_id].node_type = NodeType.LOOP
+        node_id, loop_back_node_id = sys.intern(node_id), sys.intern(loop_back_node_id)
         self.loop_conditions[node_id] = condition_func
-        # Store the loop back target as a special edge
-        self.edges[f"{node_id}_loop"] = loop_back_node_id
+        self.loop_targets[node_id] = loop_back_node_id
+        if node_id in self.nodes:
+            self.nodes[node_id].node_type = NodeType.LOOP
+        self._compiled = False
+        self._dict_cache = None
 
     def set_start_node(self, node_id: str) -> None:
         """Set the starting node for execution."""
+        node_id = sys.intern(node_id)
         if node_id not in self.nodes:
             raise ValueError(f"Node '{node_id}' does not exist")
         self.start_node = node_id
+        self._compiled = False
+        self._dict_cache = None
+
+    def validate(self) -> None:
+        """
+        Check the graph structure, raising ValueError on the first problem.
+        The check runs once per modification of the graph; execute() calls it implicitly.
+        """
+        self._compile()
+
+    def _check_references(self) -> None:
+        """Check that every node referenced by edges, branches and loops exists."""
+        for from_node_id, to_node_id in self.edges.items():
+            if from_node_id not in self.nodes:
+                raise ValueError(f"Source node '{from_node_id}' does not exist")
+            if to_node_id not in self.nodes:
+                raise ValueError(f"Target node '{to_node_id}' does not exist")
+
+        for from_node_id, to_node_ids in self.fan_out.items():
+            if from_node_id not in self.nodes:
+                raise ValueError(f"Source node '{from_node_id}' does not exist")
+            for to_node_id in to_node_ids:
+                if to_node_id not in self.nodes:
+                    raise ValueError(f"Target node '{to_node_id}' does not exist")
+
+        for node_id, branches in self.branches.items():
+            if node_id not in self.nodes:
+                raise ValueError(f"Node '{node_id}' does not exist")
+            for next_node_id in branches.values():
+                if next_node_id not in self.nodes:
+                    raise ValueError(f"Target node '{next_node_id}' does not exist")
+
+        for node_id, loop_back_node_id in self.loop_targets.items():
+            if node_id not in self.nodes:
+                raise ValueError(f"Node '{node_id}' does not exist")
+            if loop_back_node_id not in self.nodes:
+                raise ValueError(f"Loop back node '{loop_back_node_id}' does not exist")
 
     def get_next_node(self, current_node_id: str, state: Dict[str, Any]) -> Optional[str]:
         """
         Determine the next node to execute.
         Handles branching, looping, and linear flow.
         """
-        node = self.nodes[current_node_id]
+        self._compile()
+        next_idx = self._next(self._index[current_node_id], state)
+        return self._node_ids[next_idx] if next_idx >= 0 else None
+
+    # Step API over the compiled layout, for callers that drive execution themselves
+
+    def start_index(self) -> int:
+        """Return the index of the start node, or -1 if none is set."""
+        self._compile()
+        return self._index.get(self.start_node, -1)
+
+    def node_at(self, idx: int) -> Node:
+        """Return the node at a compiled index."""
+        return self.nodes[self._node_ids[idx]]
+
+    def run_node(self, idx: int, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Call the node at idx on state, serving pure nodes from the memo cache."""
+        return self._funcs[idx](state)
+
+    def output_delta(self, idx: int, result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the state updates a node's result makes; side_effect nodes make none."""
+        return dict(result) if result and not self._side_effect[idx] else {}
 
+    def next_index(self, idx: int, state: Dict[str, Any]) -> int:
+        """Return the index of the node to run after idx, or -1 to stop."""
+        return self._next(idx, state)
+
+    def _compile(self) -> None:
+        """
+        Build the array layout used by the execution loop.
+        Each node id is mapped to an integer index so a step reads a few
+        list slots instead of hashing node ids into several dicts.
+        """
+        if self._compiled:
+            return
+
+        self._check_references()
+
+        self._runner = None
+        node_ids = list(self.nodes)
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+        self._index = index
+        self._node_ids = node_ids
+        self._names = [node.name for node in self.nodes.values()]
+        self._funcs = [
+            partial(self._call_node, node) if node.metadata.get("pure") else node.func
+            for node in self.nodes.values()
+        ]
+        self._side_effect = [bool(node.metadata.get("side_effect")) for node in self.nodes.values()]
+        self._linear_next = [index.get(self.edges.get(node_id), -1) for node_id in node_ids]
+        self._branch_fn = [self.branching_rules.get(node_id) for node_id in node_ids]
+        self._branch_table = [
+            {key: index[target] for key, target in self.branches.get(node_id, {}).items()}
+            for node_id in node_ids
+        ]
+        self._loop_fn = [self.loop_conditions.get(node_id) for node_id in node_ids]
+        self._loop_target = [index.get(self.loop_targets.get(node_id), -1) for node_id in node_ids]
+
+        self._successors = [
+            [index[target] for target in self.fan_out.get(node_id, ())]
+            + ([index[self.edges[node_id]]] if node_id in self.edges else [])
+            for node_id in node_ids
+        ]
+        self._dag_order = None
+        if not self.branching_rules and not self.loop_conditions and self.start_node in index:
+            self._dag_order = self._topological_order(index[self.start_node])
+
+        if self.fan_out:
+            if self._dag_order is None:
+                raise ValueError("Fan-out edges require an acyclic graph without branching or loops")
+            # Sequential execution walks the DAG in topological order
+            self._linear_next = [-1] * len(node_ids)
+            for idx, next_idx in zip(self._dag_order, self._dag_order[1:]):
+                self._linear_next[idx] = next_idx
+
+        self._compiled = True
+
+    def _topological_order(self, start_idx: int) -> Optional[List[int]]:
+        """
+        Order the nodes reachable from start_idx so every node follows its predecessors.
+        Returns None if the reachable subgraph has a cycle.
+        """
+        reachable = {start_idx}
+        stack = [start_idx]
+        while stack:
+            for next_idx in self._successors[stack.pop()]:
+                if next_idx not in reachable:
+                    reachable.add(next_idx)
+                    stack.append(next_idx)
+
+        indegree = {idx: 0 for idx in reachable}
+        for idx in reachable:
+            for next_idx in self._successors[idx]:
+                indegree[next_idx] += 1
+        self._dag_indegree = dict(indegree)
+
+        order = []
+        ready = deque([start_idx] if indegree[start_idx] == 0 else [])
+        while ready:
+            idx = ready.popleft()
+            order.append(idx)
+            for next_idx in self._successors[idx]:
+                indegree[next_idx] -= 1
+                if indegree[next_idx] == 0:
+                    ready.append(next_idx)
+
+        return order if len(order) == len(reachable) else None
+
+    def _next(self, idx: int, state: Dict[str, Any]) -> int:
+        """Determine the index of the next node to execute, or -1 to stop."""
         # Handle looping (check this first)
-        if current_node_id in self.loop_conditions:
-            loop_func = self.loop_conditions[current_node_id]
-            if loop_func(state):
-                # Loop back to the specified node
-                loop_target = self.edges.get(f"{current_node_id}_loop")
-                if loop_target:
-                    return loop_target
+        loop_fn = self._loop_fn[idx]
+        if loop_fn is not None and loop_fn(state) and self._loop_target[idx] >= 0:
+            return self._loop_target[idx]
 
         # Handle branching
-        if current_node_id in self.branching_rules:
-            condition_func = self.branching_rules[current_node_id]
-            branch_result = condition_func(state)
-            branch_key = f"{current_node_id}_{branch_result}"
-            return self.edges.get(branch_key)
+        branch_fn = self._branch_fn[idx]
+        if branch_fn is not None:
+            return self._branch_table[idx].get(str(branch_fn(state)), -1)
 
         # Handle linear flow
-        return self.edges.get(current_node_id)
+        return self._linear_next[idx]
 
-    def execute(self, initial_state: Dict[str, Any], max_steps: int = 100) -> WorkflowRun:
+    def _call_node(self, node: Node, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Call a node's function.
+        Pure nodes are served from a per-node LRU cache keyed by their inputs.
+        Cached results are deep copies, and each hit returns a fresh copy, so
+        later nodes mutating a value in place can't change what the cache holds.
+        """
+        if not node.metadata.get("pure"):
+            return node.func(state)
+
+        key = tuple(_canonical(state.get(k)) for k in node.metadata.get("inputs", ()))
+        with self._memo_lock:
+            cache = self._memo.setdefault(node.id, OrderedDict())
+            if key in cache:
+                cache.move_to_end(key)
+                return copy.deepcopy(cache[key])
+
+        result = node.func(state)
+        with self._memo_lock:
+            cache[key] = copy.deepcopy(dict(result)) if result else {}
+            if len(cache) > MEMO_CACHE_SIZE:
+                cache.popitem(last=False)
+        return result
+
+    def execute(
+        self,
+        initial_state: Dict[str, Any],
+        max_steps: int = 100,
+        on_step: Optional[StepCallback] = None,
+    ) -> WorkflowRun:
         """
         Execute the workflow with the given initial state.
         Returns a WorkflowRun object containing final state and execution log.
+        on_step, if given, is called after every logged step (e.g. to persist it).
+        """
+        return self.compile()(initial_state, max_steps, on_step)
+
+    def compile(self) -> Callable[..., WorkflowRun]:
+        """
+        Return an execution function specialized to the current topology.
+        The function has the same signature as execute(). Graphs without
+        branching or loops become a straight sequence of node calls; otherwise
+        transitions are generated as an if/elif chain on node indices with the
+        condition functions and targets bound as constants. The result is
+        cached until the graph is modified.
         """
         if not self.start_node:
             raise ValueError("Start node not set. Call set_start_node() first.")
 
-        run_id = str(uuid.uuid4())
+        self._compile()
+        if self._runner is None:
+            if len(self._node_ids) <= CODEGEN_MAX_NODES:
+                self._runner = self._generate_runner()
+            else:
+                self._runner = self._interpret
+        return self._runner
+
+    def _generate_runner(self) -> Callable[..., WorkflowRun]:
+        """
+        Generate and exec the source of a runner for the compiled arrays.
+        If the path from the start node never branches, the nodes are called
+        in sequence; otherwise each node gets its own arm of a dispatch chain.
+        """
+        namespace: Dict[str, Any] = {
+            "WorkflowRun": WorkflowRun,
+            "ExecutionStep": ExecutionStep,
+            "new_run_id": new_run_id,
+            "datetime": datetime,
+            "perf_counter_ns": time.perf_counter_ns,
+            "graph_id": self.graph_id,
+            "record_failure": self._record_failure,
+        }
+        for idx in range(len(self._node_ids)):
+            namespace[f"func_{idx}"] = self._funcs[idx]
+
+        path = self._straight_path()
+        if path is not None:
+            # Call the nodes in order; idx tracks the running node for error reporting
+            namespace["interpret"] = self._interpret
+            steps = [f"idx = {idx}\n" + self._step_source(idx) for idx in path]
+            source = _STRAIGHT_RUNNER_TEMPLATE.format(
+                length=len(path),
+                steps=textwrap.indent("\n".join(steps), " " * 8),
+            )
+        else:
+            arms = []
+            for idx in range(len(self._node_ids)):
+                target = str(self._linear_next[idx])
+                if self._branch_fn[idx] is not None:
+                    namespace[f"branch_{idx}"] = self._branch_fn[idx]
+                    namespace[f"branch_table_{idx}"] = self._branch_table[idx]
+                    target = f"branch_table_{idx}.get(str(branch_{idx}(state)), -1)"
+                if self._loop_fn[idx] is not None and self._loop_target[idx] >= 0:
+                    namespace[f"loop_{idx}"] = self._loop_fn[idx]
+                    target = f"{self._loop_target[idx]} if loop_{idx}(state) else {target}"
+                keyword = "if" if idx == 0 else "elif"
+                arms.append(
+                    f"{keyword} idx == {idx}:\n"
+                    + textwrap.indent(self._step_source(idx), " " * 4)
+                    + f"\n    idx = {target}"
+                )
+            source = _RUNNER_TEMPLATE.format(
+                start=self._index[self.start_node],
+                arms=textwrap.indent("\n".join(arms), " " * 12),
+            )
+        exec(compile(source, f"<workflow {self.graph_id}>", "exec"), namespace)
+        return namespace["_run"]
+
+    def _straight_path(self) -> Optional[List[int]]:
+        """
+        Return the node indices visited from the start node when the graph has
+        no branching or loops and the path does not revisit a node, else None.
+        """
+        if self.branching_rules or self.loop_conditions:
+            return None
+        path: List[int] = []
+        seen = set()
+        idx = self._index[self.start_node]
+        while idx >= 0:
+            if idx in seen:
+                return None
+            seen.add(idx)
+            path.append(idx)
+            idx = self._linear_next[idx]
+        return path
+
+    def _step_source(self, idx: int) -> str:
+        """Source for calling node idx and recording its step."""
+        template = _SIDE_EFFECT_STEP_TEMPLATE if self._side_effect[idx] else _NODE_STEP_TEMPLATE
+        return template.format(idx=idx, node_id=self._node_ids[idx])
+
+    def _interpret(
+        self,
+        initial_state: Dict[str, Any],
+        max_steps: int = 100,
+        on_step: Optional[StepCallback] = None,
+    ) -> WorkflowRun:
+        """Execute the workflow by walking the compiled arrays."""
+        run_id = new_run_id()
         run = WorkflowRun(
             run_id=run_id,
             graph_id=self.graph_id,
-            state=initial_state.copy(),
+            state=dict(initial_state),
+            initial_state=dict(initial_state),
         )
 
-        current_node_id = self.start_node
+        funcs = self._funcs
+        idx = self._index[self.start_node]
         step_count = 0
+        state_version = 0
 
-        while current_node_id and step_count < max_steps:
+        while idx >= 0 and step_count < max_steps:
             step_count += 1
-            node = self.nodes.get(current_node_id)
-
-            if not node:
-                break
-
             try:
-                # Record input state
-                input_state = run.state.copy()
-
-                # Execute node function
-                result = node.func(run.state)
-                
-                # Update state with result
-                if result:
-                    run.state.update(result)
-
-                # Record execution step
-                step = ExecutionStep(
-                    node_id=current_node_id,
-                    timestamp=datetime.utcnow(),
-                    input_state=input_state,
-                    output_state=run.state.copy(),
-                    status="completed",
-                )
-                run.execution_log.append(step)
+                # Execute node function (or reuse its memoized result), then apply and log it
+                result = funcs[idx](run.state)
+                state_version = self._record_step(run, idx, result, state_version, on_step)
 
                 # Determine next node
-                current_node_id = self.get_next_node(current_node_id, run.state)
+                idx = self._next(idx, run.state)
 
             except Exception as e:
-                # Record failed step
-                step = ExecutionStep(
-                    node_id=current_node_id,
-                    timestamp=datetime.utcnow(),
-                    input_state=input_state,
-                    output_state=run.state.copy(),
-                    status="failed",
-                    error_message=str(e),
-                )
-                run.execution_log.append(step)
+                self._record_failure(run, idx, e, state_version, on_step)
                 break
 
-        # Mark execution as complete
+        # Mark execution as complete; the live state is the final state
+        run.is_completed = True
+        run.final_state = run.state
+        run.completed_at = datetime.utcnow()
+
+        return run
+
+    async def execute_async(
+        self,
+        initial_state: Dict[str, Any],
+        max_steps: int = 100,
+        on_step: Optional[StepCallback] = None,
+    ) -> WorkflowRun:
+        """
+        Execute the workflow without blocking the event loop.
+        Sync node functions run in worker threads and coroutine functions are
+        awaited. For acyclic graphs without branching or loops every node whose
+        predecessors have completed is dispatched at once; each node gets a
+        snapshot of the state and its result is merged when it completes.
+        Other graphs are traversed one node at a time.
+        """
+        if not self.start_node:
+            raise ValueError("Start node not set. Call set_start_node() first.")
+
+        self._compile()
+        run = WorkflowRun(
+            run_id=new_run_id(),
+            graph_id=self.graph_id,
+            state=dict(initial_state),
+            initial_state=dict(initial_state),
+        )
+
+        if self._dag_order is not None:
+            await self._run_dag(run, max_steps, on_step)
+        else:
+            idx = self._index[self.start_node]
+            step_count = 0
+            state_version = 0
+            while idx >= 0 and step_count < max_steps:
+                step_count += 1
+                try:
+                    result = await self._call_node_async(idx, run.state)
+                    state_version = self._record_step(run, idx, result, state_version, on_step)
+                    idx = self._next(idx, run.state)
+                except Exception as e:
+                    self._record_failure(run, idx, e, state_version, on_step)
+                    break
+
         run.is_completed = True
-        run.final_state = run.state.copy()
+        run.final_state = run.state
         run.completed_at = datetime.utcnow()
 
         return run
 
+    async def _run_dag(self, run: WorkflowRun, max_steps: int, on_step: Optional[StepCallback]) -> None:
+        """Dispatch ready nodes concurrently until the DAG is exhausted or a node fails."""
+        import asyncio  # Deferred: only async execution needs it, and it is slow to import
+
+        pending = dict(self._dag_indegree)
+        ready = deque([self._index[self.start_node]])
+        running: Dict[asyncio.Task, int] = {}
+        step_count = 0
+        state_version = 0
+
+        while ready or running:
+            while ready and step_count < max_steps:
+                idx = ready.popleft()
+                step_count += 1
+                task = asyncio.create_task(self._call_node_async(idx, dict(run.state)))
+                running[task] = idx
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            failed = False
+            for task in done:
+                idx = running.pop(task)
+                try:
+                    state_version = self._record_step(run, idx, task.result(), state_version, on_step)
+                except Exception as e:
+                    self._record_failure(run, idx, e, state_version, on_step)
+                    failed = True
+                    continue
+                # Release successors whose predecessors have all completed
+                for next_idx in self._successors[idx]:
+                    pending[next_idx] -= 1
+                    if pending[next_idx] == 0:
+                        ready.append(next_idx)
+
+            if failed:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                break
+
+    async def _call_node_async(self, idx: int, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Await a coroutine node, or run a sync node in a worker thread."""
+        import asyncio
+        import inspect
+
+        node_func = self.nodes[self._node_ids[idx]].func
+        if inspect.iscoroutinefunction(node_func):
+            return await node_func(state)
+        return await asyncio.to_thread(self._funcs[idx], state)
+
+    def _record_step(
+        self,
+        run: WorkflowRun,
+        idx: int,
+        result: Optional[Dict[str, Any]],
+        state_version: int,
+        on_step: Optional[StepCallback],
+    ) -> int:
+        """Apply a node's result to the run state and log it; returns the new state version."""
+        output_delta = self.output_delta(idx, result)
+        input_delta = {k: run.state[k] for k in output_delta if k in run.state}
+        if output_delta:
+            run.state.update(output_delta)
+            state_version += 1
+        step = ExecutionStep(
+            node_id=self._node_ids[idx],
+            timestamp_ns=time.perf_counter_ns() - run._t0_ns,
+            input_delta=input_delta,
+            output_delta=output_delta,
+            status="completed",
+            state_version=state_version,
+        )
+        run.log_step(step)
+        if on_step is not None:
+            on_step(run, step)
+        return state_version
+
+    def _record_failure(
+        self,
+        run: WorkflowRun,
+        idx: int,
+        error: Exception,
+        state_version: int,
+        on_step: Optional[StepCallback],
+    ) -> None:
+        """Log a failed node execution."""
+        step = ExecutionStep(
+            node_id=self._node_ids[idx],
+            timestamp_ns=time.perf_counter_ns() - run._t0_ns,
+            input_delta={},
+            output_delta={},
+            status="failed",
+            state_version=state_version,
+            error_message=str(error),
+        )
+        run.log_step(step)
+        if on_step is not None:
+            on_step(run, step)
+
     def to_dict(self) -> Dict[str, Any]:
-        """Serialize graph to dict (without functions)."""
-        return {
+        """
+        Serialize graph to dict (without functions). The result is cached until the graph changes.
+        Nested tables are copied, so changes to the dict never reach the live graph.
+        """
+        if self._dict_cache is not None:
+            return self._dict_cache
+        self._dict_cache = {
             "graph_id": self.graph_id,
             "name": self.name,
             "nodes": list(self.nodes.keys()),
-            "edges": self.edges,
+            "node_definitions": [
+                {
+                    "id": node.id,
+                    "name": node.name,
+                    "node_type": node.node_type.name.lower(),
+                    "metadata": copy.deepcopy(node.metadata),
+                }
+                for node in self.nodes.values()
+            ],
+            "edges": dict(self.edges),
+            "branches": {node_id: dict(branches) for node_id, branches in self.branches.items()},
+            "loop_targets": dict(self.loop_targets),
+            "fan_out": {node_id: list(targets) for node_id, targets in self.fan_out.items()},
             "start_node": self.start_node,
             "created_at": self.created_at.isoformat(),
         }
+        return self._dict_cache
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: Mapping[str, Any],
+        func_for: Callable[[str], Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    ) -> "WorkflowGraph":
+        """
+        Rebuild a graph from to_dict() output, looking up each node's function with func_for(node_id).
+        Node names, types and metadata are restored from node_definitions when present.
+        Branching and loop rules hold functions that are not serialized, so graphs using them can't be rebuilt.
+        """
+        if data.get("branches") or data.get("loop_targets"):
+            raise ValueError(f"Graph '{data['graph_id']}' uses branching or loops and cannot be rebuilt")
+
+        graph = cls(data["graph_id"], data.get("name", ""))
+        node_definitions = data.get("node_definitions") or [{"id": node_id} for node_id in data["nodes"]]
+        for node_def in node_definitions:
+            node_id = node_def["id"]
+            graph.add_node(
+                node_id,
+                node_def.get("name", node_id),
+                func_for(node_id),
+                NodeType.from_name(node_def.get("node_type", "standard")),
+                copy.deepcopy(node_def.get("metadata")),
+            )
+        for from_node, to_node in data["edges"].items():
+            graph.add_edge(from_node, to_node)
+        for from_node, targets in data.get("fan_out", {}).items():
+            graph.add_fan_out(from_node, list(targets))
+        graph.set_start_node(data["start_node"])
+        graph.created_at = datetime.fromisoformat(data["created_at"])
+        graph.validate()
+        return graph
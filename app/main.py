@@ -3,8 +3,9 @@ FastAPI application for the workflow engine.
 Exposes REST endpoints for graph creation, execution, and monitoring.
 """
 
-from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse
+from fastapi.encoders import jsonable_encoder
 import uuid
 from datetime import datetime
 from typing import Optional
@@ -12,11 +13,17 @@ import sys
 import os
 import asyncio
 import json
+import logging
+import orjson
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
 
 # Add the app directory to sys.path so relative imports work
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from engine import WorkflowGraph, NodeType
+from engine import WorkflowGraph, NodeType, new_run_id
 from schemas import (
     CreateGraphRequest,
     GraphResponse,
@@ -25,29 +32,95 @@ from schemas import (
     WorkflowRunResponse,
     StateResponse,
     ErrorResponse,
-    ExecutionStepResponse,
 )
 from database import get_db
 from tools import get_global_registry, register_tool
 from workflows import CODE_REVIEW_WORKFLOW, extract_functions, check_complexity, detect_issues, suggest_improvements, finalize_review
 
 
+def _dumps_fallback(content) -> bytes:
+    """Encode with the stdlib, for values orjson rejects such as integers beyond 64 bits."""
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FallbackORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that falls back to stdlib JSON when orjson can't encode the content."""
+
+    def render(self, content) -> bytes:
+        try:
+            return super().render(content)
+        except orjson.JSONEncodeError:
+            return _dumps_fallback(content)
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Workflow Engine API",
     description="A minimal workflow engine similar to LangGraph",
     version="1.0.0",
+    default_response_class=FallbackORJSONResponse,
 )
 
-# In-memory storage for graphs
-_graphs: dict = {}
+class GraphCache:
+    """
+    Bounded LRU cache of live WorkflowGraph objects with a per-entry TTL.
+    Misses are rebuilt from the graph stored in the database.
+    """
+
+    def __init__(self, maxsize: int = 300, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # graph_id -> (graph, expires_at)
+        self._lock = threading.RLock()
+
+    def put(self, graph_id: str, graph: WorkflowGraph) -> None:
+        with self._lock:
+            self._entries[graph_id] = (graph, time.monotonic() + self.ttl)
+            self._entries.move_to_end(graph_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, graph_id: str) -> Optional[WorkflowGraph]:
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is not None:
+                graph, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(graph_id)
+                    return graph
+                del self._entries[graph_id]
+
+        # Miss: rebuild the graph from its stored definition
+        graph_data = _db.get_graph(graph_id)
+        if not graph_data:
+            return None
+        try:
+            graph = WorkflowGraph.from_dict(
+                graph_data,
+                lambda node_id: _default_node_func(graph_data["name"], node_id),
+            )
+        except ValueError:
+            return None
+        self.put(graph_id, graph)
+        return graph
+
+    def invalidate(self, graph_id: str) -> None:
+        with self._lock:
+            self._entries.pop(graph_id, None)
+
+
+logger = logging.getLogger(__name__)
+
+# Resolved once; the database is a process-wide singleton
+_db = get_db()
+
+# Live graphs, bounded and backed by the database
+_graphs = GraphCache()
 
 
 # Register pre-built workflows and tools
 def setup_workflows():
     """Initialize built-in workflows and tools."""
-    db = get_db()
-    
     # Register code review tools
     register_tool(
         "extract_functions",
@@ -78,9 +151,161 @@ def setup_workflows():
 setup_workflows()
 
 
+# Node functions for API-defined graphs named "Code Review Mini-Agent"
+_CODE_REVIEW_FUNCS = {
+    "extract": extract_functions,
+    "check_complexity": check_complexity,
+    "detect_issues": detect_issues,
+    "suggest_improvements": suggest_improvements,
+    "finalize": finalize_review,
+}
+
+
+def _identity(state):
+    return state
+
+
+def _mark_executed(key: str, state):
+    return {key: True}
+
+
+def _default_node_func(graph_name: str, node_id: str):
+    """Pick the function for a node of an API-defined graph."""
+    # For built-in workflows, use pre-defined functions
+    if graph_name == "Code Review Mini-Agent":
+        return _CODE_REVIEW_FUNCS.get(node_id, _identity)
+    # For custom graphs, mark the node as executed; the key is formatted once here
+    return partial(_mark_executed, sys.intern(f"node_{node_id}_executed"))
+
+
+def _step_record(run, step) -> dict:
+    """Serialize an execution step for storage, keeping only its state deltas."""
+    return {
+        "node_id": step.node_id,
+        "timestamp": run.timestamp_of(step),
+        "input_delta": step.input_delta,
+        "output_delta": step.output_delta,
+        "state_version": step.state_version,
+        "status": step.status,
+        "error_message": step.error_message,
+    }
+
+
+def _persist_step(run, step) -> None:
+    """Append a finished step to the stored run as soon as it is logged."""
+    _db.append_step(run.run_id, _step_record(run, step))
+
+
+# Run headers waiting to be written by _save_worker, so responses don't wait on the database
+_save_queue: Optional[asyncio.Queue] = None
+_save_task: Optional[asyncio.Task] = None
+
+
+async def _save_worker() -> None:
+    """Drain the save queue into the database; a failed save is logged and skipped."""
+    while True:
+        run_id, run_data = await _save_queue.get()
+        try:
+            _db.save_run(run_id, run_data)
+        except Exception:
+            logger.exception("Failed to save run %s", run_id)
+        finally:
+            _save_queue.task_done()
+
+
+def _enqueue_save(run_id: str, run_data: dict) -> None:
+    """Queue a run for saving, starting the worker on the running loop if needed."""
+    global _save_queue, _save_task
+    if _save_task is None or _save_task.done() or _save_task.get_loop() is not asyncio.get_running_loop():
+        _save_queue = asyncio.Queue()
+        _save_task = asyncio.create_task(_save_worker())
+    _save_queue.put_nowait((run_id, run_data))
+
+
+# Limit on background runs from run_graph_async executing at the same time
+MAX_CONCURRENT_RUNS = 8
+
+_run_semaphore: Optional[asyncio.Semaphore] = None
+_run_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+# Strong references to running background runs, so they aren't garbage collected mid-run
+_background_runs: set = set()
+
+
+def _get_run_semaphore() -> asyncio.Semaphore:
+    """Get the background run semaphore for the running event loop."""
+    global _run_semaphore, _run_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _run_semaphore is None or _run_semaphore_loop is not loop:
+        _run_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+        _run_semaphore_loop = loop
+    return _run_semaphore
+
+
+async def _run_in_background(graph: WorkflowGraph, run_id: str, initial_state: dict) -> None:
+    """Execute a graph for run_graph_async, at most MAX_CONCURRENT_RUNS at a time."""
+    async with _get_run_semaphore():
+        try:
+            # Execute graph in a worker thread, appending steps to the placeholder run
+            run = await asyncio.to_thread(
+                graph.execute,
+                initial_state,
+                on_step=lambda run, step: _db.append_step(run_id, _step_record(run, step)),
+            )
+            
+            # Update database with results
+            _db.save_run(run_id, {
+                "run_id": run_id,
+                "graph_id": run.graph_id,
+                "state": run.state,
+                "is_completed": run.is_completed,
+                "final_state": run.final_state,
+                "created_at": run.created_at,
+                "completed_at": run.completed_at,
+            })
+        except Exception as e:
+            # Update with error status
+            _db.update_run(run_id, {
+                "is_completed": True,
+                "error": str(e)
+            })
+
+
+def _run_response(run) -> dict:
+    """
+    Build the response payload for a finished run in a single pass over its log.
+    The data comes straight from the engine, so it is returned as a plain dict and
+    encoded by orjson without re-validation; datetimes are serialized natively.
+    """
+    execution_log = []
+    previous_view, previous_state = None, None
+    for step, input_view, output_view in run.iter_states():
+        # A step's input is the previous step's output view, so its copy is reused
+        input_state = previous_state if input_view is previous_view else dict(input_view)
+        output_state = input_state if output_view is input_view else dict(output_view)
+        previous_view, previous_state = output_view, output_state
+        execution_log.append({
+            "node_id": step.node_id,
+            "timestamp": run.timestamp_of(step),
+            "input_state": input_state,
+            "output_state": output_state,
+            "status": step.status,
+            "error_message": step.error_message,
+        })
+    return {
+        "run_id": run.run_id,
+        "graph_id": run.graph_id,
+        "state": run.state,
+        "execution_log": execution_log,
+        "is_completed": run.is_completed,
+        "final_state": run.final_state,
+        "created_at": run.created_at,
+        "completed_at": run.completed_at,
+    }
+
+
 # ==================== Graph Management Endpoints ====================
 
-@app.post("/graph/create", response_model=GraphResponse)
+@app.post("/graph/create", response_model=None, responses={200: {"model": GraphResponse}})
 async def create_graph(request: CreateGraphRequest):
     """
     Create a new workflow graph.
@@ -102,25 +327,11 @@ async def create_graph(request: CreateGraphRequest):
         
         # Add nodes
         for node_def in request.nodes:
-            # For built-in workflows, use pre-defined functions
-            if request.name == "Code Review Mini-Agent":
-                func_map = {
-                    "extract": extract_functions,
-                    "check_complexity": check_complexity,
-                    "detect_issues": detect_issues,
-                    "suggest_improvements": suggest_improvements,
-                    "finalize": finalize_review,
-                }
-                func = func_map.get(node_def.id, lambda state: state)
-            else:
-                # For custom graphs, use identity function
-                func = lambda state, node_id=node_def.id: {f"node_{node_id}_executed": True}
-            
             graph.add_node(
                 node_def.id,
                 node_def.name,
-                func,
-                NodeType(node_def.node_type),
+                _default_node_func(request.name, node_def.id),
+                NodeType.from_name(node_def.node_type),
                 node_def.metadata,
             )
         
@@ -147,22 +358,17 @@ async def create_graph(request: CreateGraphRequest):
                 }
                 # graph.set_branching(branch_def.node_id, create_branch_func(branch_def.branches), branch_def.branches)
         
-        # Set start node
+        # Set start node and check all references in one pass
         graph.set_start_node(request.start_node)
+        graph.validate()
         
         # Store graph
-        _graphs[graph_id] = graph
-        db = get_db()
-        db.save_graph(graph_id, graph.to_dict())
+        _graphs.put(graph_id, graph)
+        graph_data = graph.to_dict()
+        _db.save_graph(graph_id, graph_data)
         
-        return GraphResponse(
-            graph_id=graph_id,
-            name=request.name,
-            nodes=[node_def.id for node_def in request.nodes],
-            edges={edge.from_node: edge.to_node for edge in request.edges},
-            start_node=request.start_node,
-            created_at=datetime.utcnow().isoformat(),
-        )
+        # Reuse the cached graph dict; the database keeps its own copy
+        return FallbackORJSONResponse(content=graph_data)
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -170,28 +376,27 @@ async def create_graph(request: CreateGraphRequest):
         raise HTTPException(status_code=500, detail=f"Error creating graph: {str(e)}")
 
 
-@app.get("/graph/{graph_id}", response_model=GraphResponse)
+@app.get("/graph/{graph_id}", response_model=None, responses={200: {"model": GraphResponse}})
 async def get_graph(graph_id: str):
     """Get details of a specific graph."""
-    db = get_db()
-    graph_data = db.get_graph(graph_id)
+    graph_data = _db.get_graph(graph_id)
     
     if not graph_data:
         raise HTTPException(status_code=404, detail=f"Graph '{graph_id}' not found")
     
-    return GraphResponse(**graph_data)
+    # The stored dict is a read-only view, which orjson can't encode directly
+    return FallbackORJSONResponse(content=dict(graph_data))
 
 
 @app.get("/graphs")
 async def list_graphs():
     """List all available graphs."""
-    db = get_db()
-    return {"graphs": db.list_graphs()}
+    return {"graphs": _db.list_graphs()}
 
 
 # ==================== Workflow Execution Endpoints ====================
 
-@app.post("/graph/run", response_model=WorkflowRunResponse)
+@app.post("/graph/run", response_model=None, responses={200: {"model": WorkflowRunResponse}})
 async def run_graph(request: RunGraphRequest):
     """
     Execute a workflow graph with the given initial state.
@@ -208,55 +413,21 @@ async def run_graph(request: RunGraphRequest):
         if not graph:
             raise HTTPException(status_code=404, detail=f"Graph '{request.graph_id}' not found")
         
-        # Execute graph
-        run = graph.execute(request.initial_state)
+        # Execute graph off the event loop, persisting each step as it completes
+        run = await asyncio.to_thread(graph.execute, request.initial_state, on_step=_persist_step)
         
-        # Save run to database
-        db = get_db()
-        db.save_run(run.run_id, {
+        # Queue the run header for saving; steps are already stored
+        _enqueue_save(run.run_id, {
             "run_id": run.run_id,
             "graph_id": run.graph_id,
             "state": run.state,
-            "execution_log": [
-                {
-                    "node_id": step.node_id,
-                    "timestamp": step.timestamp.isoformat(),
-                    "input_state": step.input_state,
-                    "output_state": step.output_state,
-                    "status": step.status,
-                    "error_message": step.error_message,
-                }
-                for step in run.execution_log
-            ],
             "is_completed": run.is_completed,
             "final_state": run.final_state,
-            "created_at": run.created_at.isoformat(),
-            "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+            "created_at": run.created_at,
+            "completed_at": run.completed_at,
         })
         
-        # Build response
-        execution_log = [
-            ExecutionStepResponse(
-                node_id=step.node_id,
-                timestamp=step.timestamp.isoformat(),
-                input_state=step.input_state,
-                output_state=step.output_state,
-                status=step.status,
-                error_message=step.error_message,
-            )
-            for step in run.execution_log
-        ]
-        
-        return WorkflowRunResponse(
-            run_id=run.run_id,
-            graph_id=run.graph_id,
-            state=run.state,
-            execution_log=execution_log,
-            is_completed=run.is_completed,
-            final_state=run.final_state,
-            created_at=run.created_at.isoformat(),
-            completed_at=run.completed_at.isoformat() if run.completed_at else None,
-        )
+        return FallbackORJSONResponse(content=_run_response(run))
     
     except HTTPException:
         raise
@@ -265,7 +436,7 @@ async def run_graph(request: RunGraphRequest):
 
 
 @app.post("/graph/run/async")
-async def run_graph_async(request: RunGraphRequest, background_tasks: BackgroundTasks):
+async def run_graph_async(request: RunGraphRequest):
     """
     Execute a workflow graph asynchronously in the background.
     This is an OPTIONAL feature demonstrating async capabilities.
@@ -283,58 +454,24 @@ async def run_graph_async(request: RunGraphRequest, background_tasks: Background
             raise HTTPException(status_code=404, detail=f"Graph '{request.graph_id}' not found")
         
         # Generate run ID
-        run_id = str(uuid.uuid4())
+        run_id = new_run_id()
         
         # Create placeholder run entry
-        db = get_db()
-        db.save_run(run_id, {
+        _db.save_run(run_id, {
             "run_id": run_id,
             "graph_id": request.graph_id,
             "state": request.initial_state,
             "execution_log": [],
             "is_completed": False,
             "final_state": None,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.utcnow(),
             "completed_at": None,
         })
         
-        # Execute in background
-        async def execute_in_background():
-            """Background task to execute the workflow."""
-            try:
-                # Execute graph
-                run = graph.execute(request.initial_state)
-                
-                # Update database with results
-                db.save_run(run.run_id, {
-                    "run_id": run_id,
-                    "graph_id": run.graph_id,
-                    "state": run.state,
-                    "execution_log": [
-                        {
-                            "node_id": step.node_id,
-                            "timestamp": step.timestamp.isoformat(),
-                            "input_state": step.input_state,
-                            "output_state": step.output_state,
-                            "status": step.status,
-                            "error_message": step.error_message,
-                        }
-                        for step in run.execution_log
-                    ],
-                    "is_completed": run.is_completed,
-                    "final_state": run.final_state,
-                    "created_at": run.created_at.isoformat(),
-                    "completed_at": run.completed_at.isoformat() if run.completed_at else None,
-                })
-            except Exception as e:
-                # Update with error status
-                db.update_run(run_id, {
-                    "is_completed": True,
-                    "error": str(e)
-                })
-        
-        # Add to background tasks
-        background_tasks.add_task(execute_in_background)
+        # Execute in background; the task outlives the request
+        task = asyncio.create_task(_run_in_background(graph, run_id, request.initial_state))
+        _background_runs.add(task)
+        task.add_done_callback(_background_runs.discard)
         
         return {
             "run_id": run_id,
@@ -349,25 +486,25 @@ async def run_graph_async(request: RunGraphRequest, background_tasks: Background
         raise HTTPException(status_code=500, detail=f"Error starting async execution: {str(e)}")
 
 
-@app.get("/graph/state/{run_id}", response_model=StateResponse)
+@app.get("/graph/state/{run_id}", response_model=None, responses={200: {"model": StateResponse}})
 async def get_run_state(run_id: str):
     """
     Get the current state of a workflow run.
     
     Returns: Current state and completion status
     """
-    db = get_db()
-    run_data = db.get_run(run_id)
+    run_data = _db.get_run(run_id)
     
     if not run_data:
         raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
     
-    return StateResponse(
-        run_id=run_id,
-        graph_id=run_data["graph_id"],
-        state=run_data["state"],
-        is_completed=run_data["is_completed"],
-    )
+    # A run whose header is still queued has only its steps stored so far
+    return FallbackORJSONResponse(content={
+        "run_id": run_id,
+        "graph_id": run_data.get("graph_id"),
+        "state": run_data.get("state", {}),
+        "is_completed": run_data.get("is_completed", False),
+    })
 
 
 @app.get("/runs")
@@ -375,9 +512,8 @@ async def list_runs(graph_id: Optional[str] = Query(None)):
     """
     List all workflow runs, optionally filtered by graph_id.
     """
-    db = get_db()
-    runs = db.list_runs(graph_id)
-    return {"runs": runs, "count": len(runs)}
+    runs = _db.list_runs(graph_id)
+    return FallbackORJSONResponse(content={"runs": runs, "count": len(runs)})
 
 
 # ==================== Tool Registry Endpoints ====================
@@ -392,7 +528,41 @@ async def list_tools():
 
 # ==================== Pre-built Workflows ====================
 
-@app.post("/workflows/code-review", response_model=WorkflowRunResponse)
+# Built once so its pure-node result cache is shared by every code review run
+_code_review: Optional[WorkflowGraph] = None
+
+
+def _code_review_graph() -> WorkflowGraph:
+    """Get the graph for the built-in Code Review workflow, building it on first use."""
+    global _code_review
+    if _code_review is not None:
+        return _code_review
+    
+    # Create graph from workflow definition
+    graph = WorkflowGraph(str(uuid.uuid4()), CODE_REVIEW_WORKFLOW["name"])
+    
+    # Add nodes
+    for node_def in CODE_REVIEW_WORKFLOW["nodes"]:
+        graph.add_node(
+            node_def["id"],
+            node_def["name"],
+            node_def["func"],
+            metadata=node_def.get("metadata"),
+        )
+    
+    # Add edges
+    for from_node, to_node in CODE_REVIEW_WORKFLOW["edges"]:
+        graph.add_edge(from_node, to_node)
+    
+    # Set start node
+    graph.set_start_node(CODE_REVIEW_WORKFLOW["start_node"])
+    graph.validate()
+    
+    _code_review = graph
+    return graph
+
+
+@app.post("/workflows/code-review", response_model=None, responses={200: {"model": WorkflowRunResponse}})
 async def run_code_review(request: WorkflowRequest):
     """
     Run the built-in Code Review workflow.
@@ -402,24 +572,7 @@ async def run_code_review(request: WorkflowRequest):
     - quality_threshold: Quality score threshold (default: 75)
     """
     try:
-        # Create graph from workflow definition
-        graph_id = str(uuid.uuid4())
-        graph = WorkflowGraph(graph_id, CODE_REVIEW_WORKFLOW["name"])
-        
-        # Add nodes
-        for node_def in CODE_REVIEW_WORKFLOW["nodes"]:
-            graph.add_node(
-                node_def["id"],
-                node_def["name"],
-                node_def["func"],
-            )
-        
-        # Add edges
-        for from_node, to_node in CODE_REVIEW_WORKFLOW["edges"]:
-            graph.add_edge(from_node, to_node)
-        
-        # Set start node
-        graph.set_start_node(CODE_REVIEW_WORKFLOW["start_node"])
+        graph = _code_review_graph()
         
         # Set defaults in initial state
         initial_state = request.initial_state.copy()
@@ -428,55 +581,21 @@ async def run_code_review(request: WorkflowRequest):
         if "iteration" not in initial_state:
             initial_state["iteration"] = 0
         
-        # Execute
-        run = graph.execute(initial_state)
+        # Execute off the event loop, persisting each step as it completes
+        run = await asyncio.to_thread(graph.execute, initial_state, on_step=_persist_step)
         
-        # Save run
-        db = get_db()
-        db.save_run(run.run_id, {
+        # Queue the run header for saving; steps are already stored
+        _enqueue_save(run.run_id, {
             "run_id": run.run_id,
-            "graph_id": graph_id,
+            "graph_id": run.graph_id,
             "state": run.state,
-            "execution_log": [
-                {
-                    "node_id": step.node_id,
-                    "timestamp": step.timestamp.isoformat(),
-                    "input_state": step.input_state,
-                    "output_state": step.output_state,
-                    "status": step.status,
-                    "error_message": step.error_message,
-                }
-                for step in run.execution_log
-            ],
             "is_completed": run.is_completed,
             "final_state": run.final_state,
-            "created_at": run.created_at.isoformat(),
-            "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+            "created_at": run.created_at,
+            "completed_at": run.completed_at,
         })
         
-        # Build response
-        execution_log = [
-            ExecutionStepResponse(
-                node_id=step.node_id,
-                timestamp=step.timestamp.isoformat(),
-                input_state=step.input_state,
-                output_state=step.output_state,
-                status=step.status,
-                error_message=step.error_message,
-            )
-            for step in run.execution_log
-        ]
-        
-        return WorkflowRunResponse(
-            run_id=run.run_id,
-            graph_id=graph_id,
-            state=run.state,
-            execution_log=execution_log,
-            is_completed=run.is_completed,
-            final_state=run.final_state,
-            created_at=run.created_at.isoformat(),
-            completed_at=run.completed_at.isoformat() if run.completed_at else None,
-        )
+        return FallbackORJSONResponse(content=_run_response(run))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error running code review: {str(e)}")
@@ -492,8 +611,21 @@ async def health_check():
 
 # ==================== WebSocket for Real-time Execution Streaming (OPTIONAL) ====================
 
+# Nodes that finish within this many seconds get no separate step_start event
+WS_STEP_START_DELAY = 0.001
+
+
+async def _send_event(websocket: WebSocket, payload: dict) -> None:
+    """Send one event as a JSON text frame, encoded with orjson where it can."""
+    try:
+        text = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        text = _dumps_fallback(payload).decode()
+    await websocket.send_text(text)
+
+
 @app.websocket("/ws/graph/run/{graph_id}")
-async def run_graph_websocket(websocket: WebSocket, graph_id: str):
+async def run_graph_websocket(websocket: WebSocket, graph_id: str, throttle_ms: int = Query(0, ge=0)):
     """
     WebSocket endpoint to stream execution logs in real-time.
     This is an OPTIONAL feature that demonstrates async capabilities.
@@ -501,7 +633,10 @@ async def run_graph_websocket(websocket: WebSocket, graph_id: str):
     Usage:
         Connect to ws://localhost:8000/ws/graph/run/{graph_id}
         Send initial state as JSON
-        Receive execution steps as they complete
+        Receive execution steps as they complete; step_start is only sent
+        for nodes still running after WS_STEP_START_DELAY, step_complete carries
+        the keys the node wrote and the completed event the whole final state
+        Pass ?throttle_ms=100 to pause between steps, e.g. for demos
     """
     await websocket.accept()
     
@@ -513,7 +648,7 @@ async def run_graph_websocket(websocket: WebSocket, graph_id: str):
         # Get graph
         graph = _graphs.get(graph_id)
         if not graph:
-            await websocket.send_json({
+            await _send_event(websocket, {
                 "error": f"Graph '{graph_id}' not found",
                 "status": "error"
             })
@@ -521,69 +656,78 @@ async def run_graph_websocket(websocket: WebSocket, graph_id: str):
             return
         
         # Send start notification
-        await websocket.send_json({
+        await _send_event(websocket, {
             "event": "started",
             "graph_id": graph_id,
             "timestamp": datetime.utcnow().isoformat()
         })
         
         # Execute graph with streaming
-        run_id = str(uuid.uuid4())
-        current_node_id = graph.start_node
+        run_id = new_run_id()
         state = initial_state.copy()
         execution_log = []
         step_count = 0
         max_steps = 100
         
-        while current_node_id and step_count < max_steps:
+        # Drive the graph one node at a time through its step API
+        idx = graph.start_index()
+        
+        while idx >= 0 and step_count < max_steps:
             step_count += 1
-            node = graph.nodes.get(current_node_id)
-            
-            if not node:
-                break
+            node = graph.node_at(idx)
+            current_node_id = node.id
             
             try:
-                # Send step start event
-                await websocket.send_json({
-                    "event": "step_start",
-                    "node_id": current_node_id,
-                    "node_name": node.name,
-                    "step": step_count,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
+                started_at = datetime.utcnow().isoformat()
                 
-                # Execute node
-                input_state = state.copy()
-                result = node.func(state)
+                # Execute node in a worker thread so a slow node doesn't block the socket
+                node_task = asyncio.ensure_future(asyncio.to_thread(graph.run_node, idx, state))
                 
-                if result:
-                    state.update(result)
+                # Fast nodes only send step_complete; announce the step if it is still running
+                done, _ = await asyncio.wait({node_task}, timeout=WS_STEP_START_DELAY)
+                if not done:
+                    await _send_event(websocket, {
+                        "event": "step_start",
+                        "node_id": current_node_id,
+                        "node_name": node.name,
+                        "step": step_count,
+                        "timestamp": started_at
+                    })
+                result = await node_task
+                
+                state_delta = graph.output_delta(idx, result)
+                if state_delta:
+                    state.update(state_delta)
+                
+                # One completion timestamp serves both the event and the log entry
+                completed_at = datetime.utcnow().isoformat()
                 
                 # Send step complete event
-                await websocket.send_json({
+                await _send_event(websocket, {
                     "event": "step_complete",
                     "node_id": current_node_id,
                     "node_name": node.name,
                     "step": step_count,
-                    "state": state,
-                    "timestamp": datetime.utcnow().isoformat()
+                    "state_delta": state_delta,
+                    "timestamp": completed_at
                 })
                 
                 execution_log.append({
                     "node_id": current_node_id,
                     "status": "completed",
-                    "timestamp": datetime.utcnow().isoformat()
+                    "timestamp": completed_at
                 })
                 
                 # Get next node
-                current_node_id = graph.get_next_node(current_node_id, state)
+                idx = graph.next_index(idx, state)
                 
-                # Small delay to make streaming visible
-                await asyncio.sleep(0.1)
+                # Optional delay to make streaming visible
+                if throttle_ms:
+                    await asyncio.sleep(throttle_ms / 1000)
                 
             except Exception as e:
                 # Send error event
-                await websocket.send_json({
+                await _send_event(websocket, {
                     "event": "step_error",
                     "node_id": current_node_id,
                     "error": str(e),
@@ -592,31 +736,31 @@ async def run_graph_websocket(websocket: WebSocket, graph_id: str):
                 break
         
         # Send completion event
-        await websocket.send_json({
+        finished_at = datetime.utcnow()
+        await _send_event(websocket, {
             "event": "completed",
             "run_id": run_id,
             "final_state": state,
             "total_steps": len(execution_log),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": finished_at.isoformat()
         })
         
         # Save run to database
-        db = get_db()
-        db.save_run(run_id, {
+        _db.save_run(run_id, {
             "run_id": run_id,
             "graph_id": graph_id,
             "state": state,
             "execution_log": execution_log,
             "is_completed": True,
             "final_state": state,
-            "created_at": datetime.utcnow().isoformat(),
-            "completed_at": datetime.utcnow().isoformat()
+            "created_at": finished_at,
+            "completed_at": finished_at
         })
         
     except WebSocketDisconnect:
-        print(f"WebSocket client disconnected for graph {graph_id}")
+        logger.info("WebSocket client disconnected for graph %s", graph_id)
     except Exception as e:
-        await websocket.send_json({
+        await _send_event(websocket, {
             "error": str(e),
             "status": "error"
         })
@@ -626,4 +770,14 @@ async def run_graph_websocket(websocket: WebSocket, graph_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop and httptools come with uvicorn[standard]. Stay on one worker:
+    # graphs and runs live in process memory.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning",
+    )
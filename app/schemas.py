@@ -48,7 +48,11 @@ class GraphResponse(BaseModel):
     graph_id: str
     name: str
     nodes: List[str]
+    node_definitions: List[NodeDefinition] = Field(default_factory=list)
     edges: Dict[str, str]
+    branches: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    loop_targets: Dict[str, str] = Field(default_factory=dict)
+    fan_out: Dict[str, List[str]] = Field(default_factory=dict)
     start_node: str
     created_at: str
 
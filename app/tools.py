@@ -7,7 +7,7 @@ from typing import Callable, Dict, Any, Optional
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Tool:
     """Represents a tool that can be called in a workflow."""
     name: str
@@ -32,6 +32,7 @@ class ToolRegistry:
 
     def __init__(self):
         self.tools: Dict[str, Tool] = {}
+        self._funcs: Dict[str, Callable] = {}  # name -> raw callable, for calls that skip the Tool wrapper
 
     def register(
         self,
@@ -48,11 +49,13 @@ class ToolRegistry:
             tags=tags or [],
         )
         self.tools[name] = tool
+        self._funcs[name] = func
 
     def unregister(self, name: str) -> None:
         """Unregister a tool."""
         if name in self.tools:
             del self.tools[name]
+            del self._funcs[name]
 
     def get(self, name: str) -> Optional[Tool]:
         """Get a tool by name."""
@@ -60,10 +63,18 @@ class ToolRegistry:
 
     def call(self, name: str, *args, **kwargs) -> Any:
         """Call a tool by name."""
-        tool = self.get(name)
-        if not tool:
-            raise ValueError(f"Tool '{name}' not found in registry")
-        return tool(*args, **kwargs)
+        try:
+            func = self._funcs[name]
+        except KeyError:
+            raise ValueError(f"Tool '{name}' not found in registry") from None
+        return func(*args, **kwargs)
+
+    def get_func(self, name: str) -> Callable:
+        """Get a tool's function, so callers can bind it once instead of looking it up per call."""
+        try:
+            return self._funcs[name]
+        except KeyError:
+            raise ValueError(f"Tool '{name}' not found in registry") from None
 
     def list_tools(self) -> Dict[str, Dict[str, Any]]:
         """List all available tools with metadata."""
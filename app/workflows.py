@@ -10,10 +10,127 @@ This workflow:
 5. Loops until quality_score >= threshold
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+from functools import lru_cache
+import ast
 import re
 
 
+# Patterns used by the nodes below, compiled once at import
+_FUNC_DEF_RE = re.compile(r"def\s+(\w+)\s*\((.*?)\):")
+_MAGIC_NUM_RE = re.compile(r"= \d{2,}")
+# Long lines and magic numbers found in one pass; long lines are tried first
+_ISSUE_SCAN_RE = re.compile(r"(?P<long_line>^[^\n]{101,})|(?P<magic>= \d{2,})", re.MULTILINE)
+
+
+class CodeStats(NamedTuple):
+    """Counts gathered from one pass over a piece of code."""
+    loop_count: int
+    if_count: int
+    func_count: int
+    docstring_count: int
+    import_count: int
+    # Function name -> complexity from the loops and conditionals in its own body
+    function_complexity: Dict[str, int]
+    # (name, params) of each function in source order; None if the code didn't parse
+    functions: Optional[Tuple[Tuple[str, Tuple[str, ...]], ...]]
+
+
+def _complexity(loop_count: int, if_count: int) -> int:
+    return 1 + loop_count * 2 + if_count * 1
+
+
+def _format_params(args: ast.arguments) -> Tuple[str, ...]:
+    """Render a function's parameters roughly as written, e.g. ("self", "x: int = 5", "*args")."""
+    def render(arg: ast.arg, prefix: str = "", default: Optional[ast.expr] = None) -> str:
+        text = prefix + arg.arg
+        if arg.annotation is not None:
+            text += f": {ast.unparse(arg.annotation)}"
+        if default is not None:
+            text += f" = {ast.unparse(default)}" if arg.annotation is not None else f"={ast.unparse(default)}"
+        return text
+
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+    params = [render(arg, default=default) for arg, default in zip(positional, defaults)]
+    if args.posonlyargs:
+        params.insert(len(args.posonlyargs), "/")
+    if args.vararg is not None:
+        params.append(render(args.vararg, "*"))
+    elif args.kwonlyargs:
+        params.append("*")
+    params.extend(render(arg, default=default) for arg, default in zip(args.kwonlyargs, args.kw_defaults))
+    if args.kwarg is not None:
+        params.append(render(args.kwarg, "**"))
+    return tuple(params)
+
+
+@lru_cache(maxsize=256)
+def _code_stats(code: str) -> CodeStats:
+    """
+    Count loops, conditionals, imports, functions and docstrings in a single AST walk.
+    Loops and conditionals are also bucketed by their innermost enclosing function,
+    and each function's signature is collected for extract_functions.
+    Cached by code, so the nodes of one review share a single parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        # Fall back to text heuristics for code that doesn't parse, including
+        # null bytes (ValueError) and pathologically nested expressions
+        return CodeStats(
+            loop_count=code.count("for ") + code.count("while "),
+            if_count=code.count("if ") + code.count("elif "),
+            func_count=code.count("def "),
+            docstring_count=code.count('"""'),
+            import_count=code.count("import "),
+            function_complexity={},
+            functions=None,
+        )
+    
+    totals = {"loops": 0, "ifs": 0, "funcs": 0, "docstrings": 0, "imports": 0}
+    per_function: Dict[str, Dict[str, int]] = {}
+    functions = []
+    
+    # Walk the tree once, carrying the counts of the enclosing function (if any)
+    stack = [(tree, None)]
+    while stack:
+        node, counts = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            child_counts = counts
+            if isinstance(child, (ast.For, ast.AsyncFor, ast.While)):
+                totals["loops"] += 1
+                if counts is not None:
+                    counts["loops"] += 1
+            elif isinstance(child, ast.If):  # elif branches are nested If nodes
+                totals["ifs"] += 1
+                if counts is not None:
+                    counts["ifs"] += 1
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                totals["imports"] += 1
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                totals["funcs"] += 1
+                if ast.get_docstring(child, clean=False) is not None:
+                    totals["docstrings"] += 1
+                # Functions sharing a name (e.g. methods) share one bucket
+                child_counts = per_function.setdefault(child.name, {"loops": 0, "ifs": 0})
+                functions.append((child.lineno, child.col_offset, child.name, _format_params(child.args)))
+            stack.append((child, child_counts))
+    
+    return CodeStats(
+        loop_count=totals["loops"],
+        if_count=totals["ifs"],
+        func_count=totals["funcs"],
+        docstring_count=totals["docstrings"],
+        import_count=totals["imports"],
+        function_complexity={
+            name: _complexity(counts["loops"], counts["ifs"])
+            for name, counts in per_function.items()
+        },
+        functions=tuple((name, params) for _, _, name, params in sorted(functions)),
+    )
+
+
 def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Extract function definitions from code.
@@ -21,18 +138,20 @@ def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     code = state.get("code", "")
     
-    # Simple regex to find function definitions
-    pattern = r"def\s+(\w+)\s*\((.*?)\):"
-    matches = re.finditer(pattern, code)
-    
-    functions = []
-    for match in matches:
-        func_name = match.group(1)
-        params = match.group(2)
-        functions.append({
-            "name": func_name,
-            "params": [p.strip() for p in params.split(",") if p.strip()],
-        })
+    # Read the definitions off the shared parse of the code
+    parsed = _code_stats(code).functions
+    if parsed is not None:
+        functions = [{"name": name, "params": list(params)} for name, params in parsed]
+    else:
+        # Simple regex to find function definitions in code that doesn't parse
+        functions = []
+        for match in _FUNC_DEF_RE.finditer(code):
+            func_name = match.group(1)
+            params = match.group(2)
+            functions.append({
+                "name": func_name,
+                "params": [p.strip() for p in params.split(",") if p.strip()],
+            })
     
     return {
         "functions": functions,
@@ -44,33 +163,31 @@ def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
 def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Check complexity of extracted functions.
-    Estimates complexity based on lines of code and nesting.
+    Estimates complexity from the loops and conditionals in each function.
     """
     functions = state.get("functions", [])
     code = state.get("code", "")
     
     complexity_scores = []
+    total = 0
+    
+    # Score each function by its own loops and conditionals; functions the
+    # parser didn't see fall back to the counts for the whole code
+    stats = _code_stats(code)
+    default_complexity = _complexity(stats.loop_count, stats.if_count)
     
     for func in functions:
         func_name = func["name"]
-        # Simple heuristic: count indentation levels and lines
-        # In a real scenario, use AST analysis
-        complexity = 1
-        
-        # Check for loops and conditionals in function body
-        loop_count = code.count("for ") + code.count("while ")
-        if_count = code.count("if ") + code.count("elif ")
-        
-        complexity += loop_count * 2 + if_count * 1
-        
+        score = min(stats.function_complexity.get(func_name, default_complexity), 10)  # Cap at 10
         complexity_scores.append({
             "function": func_name,
-            "complexity_score": min(complexity, 10),  # Cap at 10
+            "complexity_score": score,
         })
+        total += score
     
     return {
         "complexity_scores": complexity_scores,
-        "avg_complexity": sum(c["complexity_score"] for c in complexity_scores) / len(complexity_scores) if complexity_scores else 0,
+        "avg_complexity": total / len(complexity_scores) if complexity_scores else 0,
         "complexity_check_done": True,
     }
 
@@ -81,27 +198,39 @@ def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
     Checks for common anti-patterns.
     """
     code = state.get("code", "")
+    stats = _code_stats(code)
     issues = []
     
+    # Scan once for magic numbers and long lines; only matches are visited, and
+    # 0-based line numbers come from counting newlines since the last long line
+    magic_numbers = False
+    long_lines = []
+    line_no = pos = 0
+    for match in _ISSUE_SCAN_RE.finditer(code):
+        if match.lastgroup == "magic":
+            magic_numbers = True
+            continue
+        line_no += code.count("\n", pos, match.start())
+        pos = match.start()
+        long_lines.append(line_no)
+        # A long line is consumed whole, so check it for magic numbers too
+        if not magic_numbers and _MAGIC_NUM_RE.search(match.group()):
+            magic_numbers = True
+    
     # Check for magic numbers
-    if re.search(r"= \d{2,}", code):
+    if magic_numbers:
         issues.append("Magic numbers detected")
     
     # Check for long lines
-    lines = code.split("\n")
-    long_lines = [i for i, line in enumerate(lines) if len(line) > 100]
     if long_lines:
         issues.append(f"Long lines detected (lines: {long_lines})")
     
     # Check for missing docstrings
-    func_count = code.count("def ")
-    docstring_count = code.count('"""')
-    if docstring_count < func_count:
+    if stats.docstring_count < stats.func_count:
         issues.append("Some functions lack docstrings")
     
     # Check for unused imports or variables
-    imports = code.count("import ")
-    if imports > 10:
+    if stats.import_count > 10:
         issues.append("Too many imports")
     
     return {
@@ -128,13 +257,14 @@ def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
             )
     
     # Suggest based on detected issues
-    if "Magic numbers detected" in issues:
+    issue_set = set(issues)
+    if "Magic numbers detected" in issue_set:
         suggestions.append("Define constants for magic numbers")
     
-    if "Long lines detected" in issues:
+    if "Long lines detected" in issue_set:
         suggestions.append("Break down long lines for readability")
     
-    if "Some functions lack docstrings" in issues:
+    if "Some functions lack docstrings" in issue_set:
         suggestions.append("Add docstrings to all functions")
     
     # Calculate quality score
@@ -153,16 +283,26 @@ def suggest_improvements(state: Dict[str, Any]) -> Dict[str, Any]:
 def loop_check(state: Dict[str, Any]) -> bool:
     """
     Check if we should loop back for another iteration.
-    Returns True if quality_score < threshold.
+    Returns True if quality_score < threshold, unless the last pass left
+    the score unchanged (the code isn't revised yet, so it never improves).
+    The previous score is kept in state["_last_quality_score"] while looping
+    and removed once the loop ends.
+    Condition functions write to the state in place, so these writes (and the
+    iteration bump) show in the live and final state but not in the step
+    deltas that execution_log records.
     """
     quality_score = state.get("quality_score", 0)
     threshold = state.get("quality_threshold", 75)
     iteration = state.get("iteration", 0)
     max_iterations = 3  # Prevent infinite loops
     
-    should_loop = quality_score < threshold and iteration < max_iterations
+    # Nothing changed since the last pass, so another one would score the same
+    unchanged = state.pop("_last_quality_score", None) == quality_score
+    
+    should_loop = quality_score < threshold and iteration < max_iterations and not unchanged
     
     if should_loop:
+        state["_last_quality_score"] = quality_score
         state["iteration"] = iteration + 1
         # In real scenario, this would be feedback to improve code
         state["code"] = state["code"]  # Placeholder
@@ -188,26 +328,32 @@ def finalize_review(state: Dict[str, Any]) -> Dict[str, Any]:
 CODE_REVIEW_WORKFLOW = {
     "name": "Code Review Mini-Agent",
     "description": "Reviews code quality and suggests improvements",
+    # The analysis nodes are pure: each result depends only on the state keys
+    # listed in "inputs", so the engine caches it by their values
     "nodes": [
         {
             "id": "extract",
             "name": "Extract Functions",
             "func": extract_functions,
+            "metadata": {"pure": True, "inputs": ["code"]},
         },
         {
             "id": "check_complexity",
             "name": "Check Complexity",
             "func": check_complexity,
+            "metadata": {"pure": True, "inputs": ["functions", "code"]},
         },
         {
             "id": "detect_issues",
             "name": "Detect Issues",
             "func": detect_issues,
+            "metadata": {"pure": True, "inputs": ["code"]},
         },
         {
             "id": "suggest_improvements",
             "name": "Suggest Improvements",
             "func": suggest_improvements,
+            "metadata": {"pure": True, "inputs": ["complexity_scores", "detected_issues", "avg_complexity"]},
         },
         {
             "id": "finalize",
@@ -10,7 +10,18 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
-    from app.main import app
     import uvicorn
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop and httptools come with uvicorn[standard]. Graphs and runs live in
+    # process memory, so extra workers (WORKERS=n) don't share them; keep the
+    # default of one unless each worker can serve independently.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.environ.get("WORKERS", "1")),
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_level="warning",
+    )
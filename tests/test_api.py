@@ -0,0 +1,56 @@
+"""
+Tests for the FastAPI application.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def graph_id(client):
+    response = client.post("/graph/create", json={
+        "name": "Big Numbers",
+        "nodes": [{"id": "a", "name": "A"}],
+        "edges": [],
+        "start_node": "a",
+    })
+    assert response.status_code == 200
+    return response.json()["graph_id"]
+
+
+def test_runs_listing_survives_values_orjson_rejects(client, graph_id):
+    big = 2 ** 70
+
+    response = client.post("/graph/run", json={"graph_id": graph_id, "initial_state": {"big": big}})
+    assert response.status_code == 200
+    run_id = response.json()["run_id"]
+    assert response.json()["final_state"]["big"] == big
+
+    response = client.get("/runs", params={"graph_id": graph_id})
+    assert response.status_code == 200
+    runs = {run["run_id"]: run for run in response.json()["runs"]}
+    assert runs[run_id]["state"]["big"] == big
+
+    response = client.get(f"/graph/state/{run_id}")
+    assert response.status_code == 200
+    assert response.json()["state"]["big"] == big
+
+
+def test_websocket_streams_values_orjson_rejects(client, graph_id):
+    big = 2 ** 70
+    with client.websocket_connect(f"/ws/graph/run/{graph_id}") as websocket:
+        websocket.send_text(json.dumps({"big": big}))
+        while True:
+            event = json.loads(websocket.receive_text())
+            if event.get("event") == "completed":
+                break
+    assert event["final_state"]["big"] == big
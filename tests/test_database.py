@@ -0,0 +1,55 @@
+"""
+Tests for the in-memory database.
+"""
+
+from app.database import Database
+
+
+def test_least_recently_used_run_is_evicted():
+    db = Database(run_capacity=2)
+    db.save_run("r1", {"run_id": "r1"})
+    db.save_run("r2", {"run_id": "r2"})
+    db.get_run("r1")  # r2 is now least recently used
+
+    db.save_run("r3", {"run_id": "r3"})
+
+    assert db.get_run("r2") is None
+    assert [run["run_id"] for run in db.list_runs()] == ["r1", "r3"]
+    assert len(db._run_slots) == 2
+
+
+def test_evicted_slot_reuses_its_execution_log_list():
+    db = Database(run_capacity=1)
+    db.append_step("r1", {"node_id": "a"})
+    execution_log = db._run_slots[0]["execution_log"]
+
+    db.append_step("r2", {"node_id": "b"})
+
+    assert db._run_slots[0]["execution_log"] is execution_log
+    assert db.get_run("r2")["execution_log"] == [{"node_id": "b"}]
+
+
+def test_returned_runs_are_not_changed_by_eviction():
+    db = Database(run_capacity=1)
+    db.save_run("r1", {"run_id": "r1", "graph_id": "g1"})
+    db.append_step("r1", {"node_id": "a"})
+    run = db.get_run("r1")
+    (listed,) = db.list_runs("g1")
+
+    db.save_run("r2", {"run_id": "r2", "graph_id": "g2", "execution_log": [{"node_id": "b"}]})
+
+    for held in (run, listed):
+        assert held["run_id"] == "r1"
+        assert held["execution_log"] == [{"node_id": "a"}]
+
+
+def test_deleted_run_slot_is_reused_before_eviction():
+    db = Database(run_capacity=2)
+    db.save_run("r1", {"run_id": "r1"})
+    db.save_run("r2", {"run_id": "r2"})
+    assert db.delete_run("r1")
+
+    db.save_run("r3", {"run_id": "r3"})
+
+    assert db.get_run("r2") is not None
+    assert len(db._run_slots) == 2
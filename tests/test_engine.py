@@ -0,0 +1,278 @@
+"""
+Tests for the workflow engine.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app import engine
+from app.engine import WorkflowGraph, NodeType
+
+
+def _memo_graph() -> WorkflowGraph:
+    """A pure node returning a list, followed by a node that appends to it in place."""
+    graph = WorkflowGraph("memo", "Memo")
+    graph.add_node(
+        "produce", "Produce",
+        lambda state: {"lst": [1, 2]},
+        metadata={"pure": True, "inputs": ["x"]},
+    )
+    graph.add_node("mutate", "Mutate", lambda state: state["lst"].append(9))
+    graph.add_edge("produce", "mutate")
+    graph.set_start_node("produce")
+    return graph
+
+
+@pytest.mark.parametrize("codegen_max_nodes", [engine.CODEGEN_MAX_NODES, 0])
+def test_memoized_result_is_not_shared_between_runs(monkeypatch, codegen_max_nodes):
+    monkeypatch.setattr(engine, "CODEGEN_MAX_NODES", codegen_max_nodes)
+    graph = _memo_graph()
+
+    first = graph.execute({"x": 1})
+    second = graph.execute({"x": 1})
+
+    assert first.final_state["lst"] == [1, 2, 9]
+    assert second.final_state["lst"] == [1, 2, 9]
+    assert graph._memo["produce"][(1,)] == {"lst": [1, 2]}
+
+
+def test_node_type_is_set_with_branching_and_loop_rules():
+    graph = WorkflowGraph("types", "Types")
+    for node_id in ("a", "b", "c"):
+        graph.add_node(node_id, node_id.upper(), lambda state: {})
+    graph.add_edge("a", "b")
+    graph.set_branching("b", lambda state: "next", {"next": "c"})
+    graph.set_loop("c", lambda state: False, "a")
+    graph.set_start_node("a")
+
+    node_types = [node_def["node_type"] for node_def in graph.to_dict()["node_definitions"]]
+    assert node_types == ["standard", "conditional", "loop"]
+    assert graph.nodes["b"].node_type is NodeType.CONDITIONAL
+
+
+def _fan_out_graph(b, c) -> WorkflowGraph:
+    """a fans out to b and c, which both feed d."""
+    graph = WorkflowGraph("fan-out", "Fan Out")
+    graph.add_node("a", "A", lambda state: {"a": True})
+    graph.add_node("b", "B", b)
+    graph.add_node("c", "C", c)
+    graph.add_node("d", "D", lambda state: {"d": (state.get("b"), state.get("c"))})
+    graph.add_fan_out("a", ["b", "c"])
+    graph.add_edge("b", "d")
+    graph.add_edge("c", "d")
+    graph.set_start_node("a")
+    return graph
+
+
+@pytest.mark.asyncio
+async def test_execute_async_runs_fan_out_branches_concurrently():
+    # Each branch waits for the other, so this only finishes if both run at once
+    barrier = threading.Barrier(2, timeout=5)
+
+    def branch(key):
+        def func(state):
+            barrier.wait()
+            return {key: state["a"]}
+        return func
+
+    run = await _fan_out_graph(branch("b"), branch("c")).execute_async({})
+
+    order = [step.node_id for step in run.execution_log]
+    assert order[0] == "a" and order[-1] == "d"
+    assert sorted(order[1:3]) == ["b", "c"]
+    assert all(step.status == "completed" for step in run.execution_log)
+    assert run.final_state["d"] == (True, True)
+
+
+@pytest.mark.asyncio
+async def test_execute_async_merges_parallel_writes_in_completion_order():
+    async def fast(state):
+        return {"winner": "fast"}
+
+    async def slow(state):
+        await asyncio.sleep(0.05)
+        return {"winner": "slow"}
+
+    run = await _fan_out_graph(fast, slow).execute_async({})
+
+    assert [step.node_id for step in run.execution_log] == ["a", "b", "c", "d"]
+    assert run.final_state["winner"] == "slow"
+
+
+@pytest.mark.asyncio
+async def test_execute_async_cancels_running_nodes_on_failure():
+    cancelled = asyncio.Event()
+
+    async def fail(state):
+        raise RuntimeError("boom")
+
+    async def wait_forever(state):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    run = await asyncio.wait_for(_fan_out_graph(fail, wait_forever).execute_async({}), timeout=5)
+
+    assert cancelled.is_set()
+    assert [(step.node_id, step.status) for step in run.execution_log] == [
+        ("a", "completed"),
+        ("b", "failed"),
+    ]
+    assert run.execution_log[-1].error_message == "boom"
+    assert "d" not in run.final_state
+
+
+@pytest.mark.asyncio
+async def test_execute_async_stops_at_max_steps():
+    graph = _fan_out_graph(lambda state: {"b": 1}, lambda state: {"c": 1})
+
+    run = await graph.execute_async({}, max_steps=2)
+
+    assert len(run.execution_log) == 2
+    assert run.is_completed
+    assert "d" not in run.final_state
+
+
+@pytest.mark.asyncio
+async def test_execute_async_does_not_memoize_coroutine_nodes():
+    calls = []
+
+    async def produce(state):
+        calls.append(state["x"])
+        return {"y": state["x"]}
+
+    graph = WorkflowGraph("async-memo", "Async Memo")
+    graph.add_node("produce", "Produce", produce, metadata={"pure": True, "inputs": ["x"]})
+    graph.set_start_node("produce")
+
+    await graph.execute_async({"x": 1})
+    await graph.execute_async({"x": 1})
+
+    assert calls == [1, 1]
+
+
+def test_add_fan_out_rejects_cycles():
+    graph = WorkflowGraph("cycle", "Cycle")
+    for node_id in ("a", "b"):
+        graph.add_node(node_id, node_id.upper(), lambda state: {})
+    graph.add_fan_out("a", ["b"])
+    graph.add_edge("b", "a")
+    graph.set_start_node("a")
+
+    with pytest.raises(ValueError):
+        graph.validate()
+
+
+def _branching_graph() -> WorkflowGraph:
+    graph = WorkflowGraph("branching", "Branching")
+    graph.add_node("start", "Start", lambda state: {"seen": ["start"]})
+    graph.add_node("big", "Big", lambda state: {"size": "big"})
+    graph.add_node("small", "Small", lambda state: {"size": "small"})
+    graph.add_edge("start", "big")
+    graph.set_branching("start", lambda state: "big" if state["n"] > 10 else "small", {"big": "big", "small": "small"})
+    graph.set_start_node("start")
+    return graph
+
+
+def _loop_graph() -> WorkflowGraph:
+    graph = WorkflowGraph("loop", "Loop")
+    graph.add_node("inc", "Increment", lambda state: {"n": state["n"] + 1})
+    graph.add_node("done", "Done", lambda state: {"done": True})
+    graph.add_edge("inc", "done")
+    graph.set_loop("inc", lambda state: state["n"] < 3, "inc")
+    graph.set_start_node("inc")
+    return graph
+
+
+def _chain_graph(*funcs, metadata=None) -> WorkflowGraph:
+    graph = WorkflowGraph("chain", "Chain")
+    node_ids = [f"n{i}" for i in range(len(funcs))]
+    for node_id, func in zip(node_ids, funcs):
+        graph.add_node(node_id, node_id, func, metadata=(metadata or {}).get(node_id))
+    for from_node, to_node in zip(node_ids, node_ids[1:]):
+        graph.add_edge(from_node, to_node)
+    graph.set_start_node(node_ids[0])
+    return graph
+
+
+def _fail(state):
+    raise RuntimeError("boom")
+
+
+# name -> (graph factory, initial state, max_steps, expected (node_id, status) log, expected final state)
+_RUNNER_CASES = {
+    "branch-big": (
+        _branching_graph, {"n": 20}, 100,
+        [("start", "completed"), ("big", "completed")],
+        {"n": 20, "seen": ["start"], "size": "big"},
+    ),
+    "branch-small": (
+        _branching_graph, {"n": 1}, 100,
+        [("start", "completed"), ("small", "completed")],
+        {"n": 1, "seen": ["start"], "size": "small"},
+    ),
+    "loop-back": (
+        _loop_graph, {"n": 0}, 100,
+        [("inc", "completed")] * 3 + [("done", "completed")],
+        {"n": 3, "done": True},
+    ),
+    "side-effect": (
+        lambda: _chain_graph(
+            lambda state: {"a": 1},
+            lambda state: {"ignored": True},
+            lambda state: {"c": state["a"] + 1},
+            metadata={"n1": {"side_effect": True}},
+        ),
+        {}, 100,
+        [("n0", "completed"), ("n1", "completed"), ("n2", "completed")],
+        {"a": 1, "c": 2},
+    ),
+    "raises": (
+        lambda: _chain_graph(lambda state: {"a": 1}, _fail, lambda state: {"c": 1}),
+        {}, 100,
+        [("n0", "completed"), ("n1", "failed")],
+        {"a": 1},
+    ),
+    "max-steps-chain": (
+        lambda: _chain_graph(lambda state: {"a": 1}, lambda state: {"b": 1}, lambda state: {"c": 1}),
+        {}, 2,
+        [("n0", "completed"), ("n1", "completed")],
+        {"a": 1, "b": 1},
+    ),
+    "max-steps-loop": (
+        _loop_graph, {"n": 0}, 2,
+        [("inc", "completed")] * 2,
+        {"n": 2},
+    ),
+}
+
+
+@pytest.mark.parametrize("codegen_max_nodes", [engine.CODEGEN_MAX_NODES, 0])
+@pytest.mark.parametrize("case", sorted(_RUNNER_CASES))
+def test_generated_runner_matches_interpreter(monkeypatch, codegen_max_nodes, case):
+    make_graph, initial_state, max_steps, expected_log, expected_state = _RUNNER_CASES[case]
+    monkeypatch.setattr(engine, "CODEGEN_MAX_NODES", codegen_max_nodes)
+    graph = make_graph()
+
+    run = graph.execute(initial_state, max_steps=max_steps)
+
+    assert (graph._runner == graph._interpret) == (codegen_max_nodes == 0)
+    assert [(step.node_id, step.status) for step in run.execution_log] == expected_log
+    assert run.final_state == expected_state
+    assert run.is_completed
+
+    # Deltas and versions match what the interpreter records for the same graph
+    reference = make_graph()
+    reference._compile()
+    expected = reference._interpret(initial_state, max_steps)
+    assert [
+        (step.node_id, step.status, step.output_delta, step.state_version, step.error_message)
+        for step in run.execution_log
+    ] == [
+        (step.node_id, step.status, step.output_delta, step.state_version, step.error_message)
+        for step in expected.execution_log
+    ]